@@ -12,23 +12,87 @@ Usage:
 
 import argparse
 import fnmatch
+import gzip
+import html
+import importlib
+import json
+import multiprocessing
+import os
 import re
+import shutil
 import subprocess
 import sys
+import time
+import warnings
 import webbrowser
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+# Pygments is slow to import, so load_pygments() only pulls it in once
+# main() has validated its arguments; None until then
+PYGMENTS_AVAILABLE = None
+
+
+def load_pygments() -> bool:
+    """Import Pygments into the module namespace; return whether it is installed."""
+    global PYGMENTS_AVAILABLE, PYGMENTS_VERSION, highlight, get_all_lexers, get_lexer_by_name
+    global get_lexer_for_filename, guess_lexer, HtmlFormatter, ClassNotFound, Lexer
+    if PYGMENTS_AVAILABLE is None:
+        try:
+            from pygments import __version__ as PYGMENTS_VERSION, highlight
+            from pygments.lexers import (
+                get_all_lexers, get_lexer_by_name, get_lexer_for_filename, guess_lexer,
+            )
+            from pygments.formatters import HtmlFormatter
+            from pygments.lexer import Lexer
+            from pygments.util import ClassNotFound
+            PYGMENTS_AVAILABLE = True
+        except ImportError:
+            PYGMENTS_AVAILABLE = False
+    return PYGMENTS_AVAILABLE
+
+# Set by load_tree_sitter() when --fast is given and tree_sitter_languages
+# is installed and usable
+TREE_SITTER_AVAILABLE = False
+
+
+def make_tree_sitter_parser(language: str):
+    """Return a tree-sitter parser for a grammar, or None if it cannot be built."""
+    try:
+        with warnings.catch_warnings():
+            # tree_sitter_languages uses an API that tree-sitter 0.21 deprecates
+            warnings.simplefilter('ignore', FutureWarning)
+            return get_tree_sitter_parser(language)
+    except Exception:
+        # e.g. tree-sitter >= 0.22, whose Language() tree_sitter_languages
+        # calls with the wrong arguments
+        return None
+
+
+def load_tree_sitter() -> bool:
+    """Import tree_sitter_languages for --fast; return whether it works."""
+    global TREE_SITTER_AVAILABLE, get_tree_sitter_parser
+    try:
+        from tree_sitter_languages import get_parser as get_tree_sitter_parser
+    except ImportError:
+        TREE_SITTER_AVAILABLE = False
+        return False
+    # The import succeeds even with an incompatible tree-sitter, so build
+    # one parser to be sure
+    TREE_SITTER_AVAILABLE = make_tree_sitter_parser('python') is not None
+    return TREE_SITTER_AVAILABLE
+
+
+# blake3 hashes cache keys several times faster than hashlib when installed
 try:
-    from pygments import highlight
-    from pygments.lexers import get_lexer_for_filename, guess_lexer
-    from pygments.formatters import HtmlFormatter
-    PYGMENTS_AVAILABLE = True
+    from blake3 import blake3 as content_hash
 except ImportError:
-    PYGMENTS_AVAILABLE = False
+    from hashlib import sha1 as content_hash
 
 
 # Common source file extensions to include
-SOURCE_EXTENSIONS = {
+SOURCE_EXTENSIONS = frozenset({
     'py', 'js', 'ts', 'jsx', 'tsx', 'c', 'cc', 'cpp', 'h', 'hpp',
     'java', 'go', 'rs', 'rb', 'php', 'swift', 'kt', 'scala',
     'sh', 'bash', 'zsh', 'fish', 'ps1',
@@ -38,62 +102,90 @@ SOURCE_EXTENSIONS = {
     'lua', 'r', 'pl', 'pm', 'hs', 'ml', 'ex', 'exs',
     'vue', 'svelte', 'astro',
     'dockerfile', 'makefile', 'cmake',
+})
+
+# Suffixes rendered as escaped plain text without going through Pygments
+PLAIN_TEXT_SUFFIXES = {'.txt'}
+
+# Grammars used for --fast, by file suffix; other files still use Pygments
+TREE_SITTER_LANGUAGES = {
+    '.py': 'python', '.js': 'javascript', '.jsx': 'javascript',
+    '.ts': 'typescript', '.tsx': 'tsx',
+    '.c': 'c', '.h': 'c', '.cc': 'cpp', '.cpp': 'cpp', '.hpp': 'cpp',
+    '.java': 'java', '.go': 'go', '.rs': 'rust', '.rb': 'ruby', '.php': 'php',
+    '.sh': 'bash', '.bash': 'bash', '.lua': 'lua', '.css': 'css', '.html': 'html',
+    '.json': 'json', '.yaml': 'yaml', '.yml': 'yaml', '.toml': 'toml',
 }
 
+# Bundles with fewer files than this are highlighted in-process, where
+# starting worker processes would cost more than it saves
+PARALLEL_MIN_FILES = 4
 
+# Where resolved lexers and highlighted files are remembered between runs
+CACHE_DIR = Path(os.environ.get('SRC2HTML_CACHE') or Path.home() / '.cache' / 'src2html')
+
+# Part of every highlighted-HTML cache key; bump when the markup changes
+HTML_CACHE_VERSION = 1
+
+# Highlighted-HTML cache entries not used for this many days are removed
+HTML_CACHE_MAX_AGE_DAYS = 30
+
+
+# Page header. __PYGMENTS_CSS__ is filled in once at import, __TITLE__ by
+# render_header()
 HTML_HEADER = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
+    <title>__TITLE__</title>
     <style>
-        * {{
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
-        body {{
+        }
+        body {
             font-family: 'Menlo', 'Monaco', 'Consolas', 'Liberation Mono', monospace;
             font-size: 13px;
             line-height: 1.4;
             background: #fff;
             color: #000;
             padding-left: 16px;
-        }}
+        }
         
         /* Table of Contents */
-        .toc {{
+        .toc {
             padding: 16px;
             background: #f8f8f8;
             border-bottom: 1px solid #ddd;
             margin-bottom: 16px;
-        }}
-        .toc h2 {{
+        }
+        .toc h2 {
             font-size: 14px;
             margin-bottom: 8px;
             color: #333;
-        }}
-        .toc ul {{
+        }
+        .toc ul {
             list-style: none;
-        }}
-        .toc li {{
+        }
+        .toc li {
             margin-bottom: 4px;
-        }}
-        .toc a {{
+        }
+        .toc a {
             color: #0066cc;
             text-decoration: none;
             font-size: 12px;
-        }}
-        .toc a:hover {{
+        }
+        .toc a:hover {
             text-decoration: underline;
-        }}
+        }
         
         /* File sections */
-        .file-section {{
+        .file-section {
             margin-bottom: 24px;
-        }}
-        .file-header {{
+        }
+        .file-header {
             font-size: 14px;
             font-weight: bold;
             color: #000;
@@ -102,78 +194,81 @@ HTML_HEADER = """<!DOCTYPE html>
             background: #e0e0e0;
             -webkit-print-color-adjust: exact;
             print-color-adjust: exact;
-        }}
-        .highlight {{
+        }
+        .highlight {
             background: #fff;
-        }}
-        .highlight pre {{
+        }
+        .highlight pre {
             margin: 0;
             white-space: pre;
-        }}
-        .highlighttable {{
+        }
+        .highlighttable {
             border-collapse: collapse;
             width: 100%;
-        }}
-        .highlighttable td {{
+        }
+        .highlighttable td {
             padding: 0;
             vertical-align: top;
-        }}
-        .highlighttable td.linenos {{
+        }
+        .highlighttable td.linenos {
             background: #f8f8f8;
             color: #999;
             text-align: right;
             padding: 0 5px 0 4px;
             user-select: none;
             border-right: 1px solid #eee;
-        }}
-        .linenos pre {{
+        }
+        .linenos pre {
             margin: 0;
-        }}
-        .highlighttable td.code {{
+        }
+        .highlighttable td.code {
             padding-left: 10px;
-        }}
-        .code pre {{
+        }
+        .code pre {
             margin: 0;
-        }}
+        }
         
         /* Print styles */
-        @media print {{
-            body {{
+        @media print {
+            body {
                 font-size: 10px;
                 padding-left: 0;
-            }}
-            .toc {{
+            }
+            .toc {
                 page-break-after: always;
-            }}
-            .file-section {{
+            }
+            .file-section {
                 page-break-before: always;
-            }}
-            .file-section:first-of-type {{
+            }
+            .file-section:first-of-type {
                 page-break-before: avoid;
-            }}
-            .file-header {{
+            }
+            .file-section.duplicate {
+                page-break-before: avoid;
+            }
+            .file-header {
                 font-size: 12px;
                 padding: 6px 8px;
                 background: #d0d0d0;
                 border-bottom: 2px solid #999;
-            }}
-            .linenos {{
+            }
+            .linenos {
                 padding: 0 4px 0 2px;
-            }}
-            .code {{
+            }
+            .code {
                 padding-left: 4px;
-            }}
-        }}
+            }
+        }
         
-        @page {{
+        @page {
             size: A4;
             margin: 0.7cm 0.7cm 1.5cm 0.7cm;
-            @bottom-center {{
+            @bottom-center {
                 content: counter(page);
-            }}
-        }}
+            }
+        }
         
-        {pygments_css}
+        __PYGMENTS_CSS__
     </style>
 </head>
 <body>
@@ -183,68 +278,84 @@ HTML_FOOTER = """</body>
 </html>
 """
 
-# Clean light theme syntax colors (print-friendly)
-CATPPUCCIN_CSS = """
-.highlight .hll { background-color: #ffffcc }
-.highlight .c { color: #6a737d } /* Comment */
-.highlight .k { color: #d73a49 } /* Keyword */
-.highlight .n { color: #24292e } /* Name */
-.highlight .o { color: #24292e } /* Operator */
-.highlight .p { color: #24292e } /* Punctuation */
-.highlight .cm { color: #6a737d } /* Comment.Multiline */
-.highlight .cp { color: #d73a49 } /* Comment.Preproc */
-.highlight .c1 { color: #6a737d } /* Comment.Single */
-.highlight .cs { color: #6a737d } /* Comment.Special */
-.highlight .gd { color: #b31d28; background-color: #ffeef0 } /* Generic.Deleted */
-.highlight .ge { font-style: italic } /* Generic.Emph */
-.highlight .gi { color: #22863a; background-color: #f0fff4 } /* Generic.Inserted */
-.highlight .gs { font-weight: bold } /* Generic.Strong */
-.highlight .gu { color: #6f42c1 } /* Generic.Subheading */
-.highlight .kc { color: #d73a49 } /* Keyword.Constant */
-.highlight .kd { color: #d73a49 } /* Keyword.Declaration */
-.highlight .kn { color: #d73a49 } /* Keyword.Namespace */
-.highlight .kp { color: #d73a49 } /* Keyword.Pseudo */
-.highlight .kr { color: #d73a49 } /* Keyword.Reserved */
-.highlight .kt { color: #d73a49 } /* Keyword.Type */
-.highlight .m { color: #005cc5 } /* Literal.Number */
-.highlight .s { color: #032f62 } /* Literal.String */
-.highlight .na { color: #6f42c1 } /* Name.Attribute */
-.highlight .nb { color: #005cc5 } /* Name.Builtin */
-.highlight .nc { color: #6f42c1 } /* Name.Class */
-.highlight .no { color: #005cc5 } /* Name.Constant */
-.highlight .nd { color: #6f42c1 } /* Name.Decorator */
-.highlight .ni { color: #24292e } /* Name.Entity */
-.highlight .ne { color: #d73a49 } /* Name.Exception */
-.highlight .nf { color: #6f42c1 } /* Name.Function */
-.highlight .nl { color: #24292e } /* Name.Label */
-.highlight .nn { color: #6f42c1 } /* Name.Namespace */
-.highlight .nt { color: #22863a } /* Name.Tag */
-.highlight .nv { color: #e36209 } /* Name.Variable */
-.highlight .ow { color: #d73a49 } /* Operator.Word */
-.highlight .w { color: #24292e } /* Text.Whitespace */
-.highlight .mf { color: #005cc5 } /* Literal.Number.Float */
-.highlight .mh { color: #005cc5 } /* Literal.Number.Hex */
-.highlight .mi { color: #005cc5 } /* Literal.Number.Integer */
-.highlight .mo { color: #005cc5 } /* Literal.Number.Oct */
-.highlight .sb { color: #032f62 } /* Literal.String.Backtick */
-.highlight .sc { color: #032f62 } /* Literal.String.Char */
-.highlight .sd { color: #032f62 } /* Literal.String.Doc */
-.highlight .s2 { color: #032f62 } /* Literal.String.Double */
-.highlight .se { color: #005cc5 } /* Literal.String.Escape */
-.highlight .sh { color: #032f62 } /* Literal.String.Heredoc */
-.highlight .si { color: #005cc5 } /* Literal.String.Interpol */
-.highlight .sx { color: #032f62 } /* Literal.String.Other */
-.highlight .sr { color: #032f62 } /* Literal.String.Regex */
-.highlight .s1 { color: #032f62 } /* Literal.String.Single */
-.highlight .ss { color: #005cc5 } /* Literal.String.Symbol */
-.highlight .bp { color: #005cc5 } /* Name.Builtin.Pseudo */
-.highlight .vc { color: #e36209 } /* Name.Variable.Class */
-.highlight .vg { color: #e36209 } /* Name.Variable.Global */
-.highlight .vi { color: #e36209 } /* Name.Variable.Instance */
-.highlight .il { color: #005cc5 } /* Literal.Number.Integer.Long */
+# Token colors for the stylesheet when Pygments is not installed; covers the
+# classes --fast emits
+FALLBACK_CSS = """
+.highlight .c { color: #6a737d }
+.highlight .k, .highlight .kc, .highlight .kt, .highlight .cp { color: #d73a49 }
+.highlight .m { color: #005cc5 }
+.highlight .s { color: #032f62 }
+.highlight .n, .highlight .p { color: #24292e }
 """
 
 
+def make_print_style():
+    """Build the clean, print-friendly light Pygments style used for pages."""
+    from pygments.style import Style
+    from pygments.token import (
+        Comment, Generic, Keyword, Name, Number, Operator, Punctuation, String, Text,
+    )
+    
+    class PrintStyle(Style):
+        background_color = '#fff'
+        highlight_color = '#ffffcc'
+        styles = {
+            Comment: '#6a737d',
+            Comment.Preproc: '#d73a49',
+            Keyword: '#d73a49',
+            Name: '#24292e',
+            Name.Attribute: '#6f42c1',
+            Name.Builtin: '#005cc5',
+            Name.Class: '#6f42c1',
+            Name.Constant: '#005cc5',
+            Name.Decorator: '#6f42c1',
+            Name.Exception: '#d73a49',
+            Name.Function: '#6f42c1',
+            Name.Namespace: '#6f42c1',
+            Name.Tag: '#22863a',
+            Name.Variable: '#e36209',
+            Operator: '#24292e',
+            Operator.Word: '#d73a49',
+            Punctuation: '#24292e',
+            Text.Whitespace: '#24292e',
+            Number: '#005cc5',
+            String: '#032f62',
+            String.Escape: '#005cc5',
+            String.Interpol: '#005cc5',
+            String.Symbol: '#005cc5',
+            Generic.Deleted: 'bg:#ffeef0 #b31d28',
+            Generic.Emph: 'italic',
+            Generic.Inserted: 'bg:#f0fff4 #22863a',
+            Generic.Strong: 'bold',
+            Generic.Subheading: '#6f42c1',
+        }
+    
+    return PrintStyle
+
+
+# Page header with the stylesheet filled in, leaving only the title; built
+# by render_header() once Pygments has been loaded
+_HEADER_TEMPLATE = None
+
+
+def style_css() -> str:
+    """Return the token stylesheet, generated by Pygments when available."""
+    if not PYGMENTS_AVAILABLE:
+        return FALLBACK_CSS
+    formatter = HtmlFormatter(style=make_print_style(), cssclass="highlight")
+    rules = formatter.get_background_style_defs('.highlight')
+    rules += formatter.get_token_style_defs('.highlight')
+    return '\n' + '\n'.join(rules) + '\n'
+
+
+def render_header(title: str) -> str:
+    """Return the page header for the given (unescaped) title."""
+    global _HEADER_TEMPLATE
+    if _HEADER_TEMPLATE is None:
+        _HEADER_TEMPLATE = HTML_HEADER.replace('__PYGMENTS_CSS__', style_css())
+    return _HEADER_TEMPLATE.replace('__TITLE__', html.escape(title))
+
+
 def collect_files(directory: Path, not_match_patterns: list[str], exclude_extensions: list[str]) -> list[Path]:
     """
     Recursively collect source files from a directory, applying filters.
@@ -268,26 +379,38 @@ def collect_files(directory: Path, not_match_patterns: list[str], exclude_extens
         'vendor',  # Go/PHP
     }
     
+    def walk(path):
+        """Yield file entries below path without entering skipped directories."""
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    # Skip hidden files and directories, and ignored directories
+                    if entry.name.startswith('.') or entry.name in ignored_dirs:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from walk(entry.path)
+                    elif entry.is_file():
+                        yield entry
+        except PermissionError:
+            return
+    
     files = []
     exclude_ext_set = {ext.lower().lstrip('.') for ext in exclude_extensions}
+    # One alternation of the patterns, so each name is scanned once
+    exclude_re = None
+    if not_match_patterns:
+        exclude_re = re.compile('|'.join(map(re.escape, not_match_patterns)))
     
-    for file_path in directory.rglob('*'):
-        if not file_path.is_file():
-            continue
-        
-        # Skip hidden files and directories
-        if any(part.startswith('.') for part in file_path.parts):
-            continue
+    for entry in walk(directory):
+        filename = entry.name
         
-        # Skip ignored directories
-        if any(part in ignored_dirs for part in file_path.parts):
-            continue
-        
-        # Get extension (handle files like Makefile, Dockerfile)
-        ext = file_path.suffix.lower().lstrip('.')
+        # Get extension (handle files like Makefile, Dockerfile); plain
+        # string slicing, as most names in a big tree are rejected right here
+        dot = filename.rfind('.')
+        ext = filename[dot + 1:].lower() if dot >= 0 else ''
         if not ext:
             # Check if it's a known extensionless file
-            name_lower = file_path.name.lower()
+            name_lower = filename.lower()
             if name_lower in ('makefile', 'dockerfile', 'rakefile', 'gemfile'):
                 ext = name_lower
             else:
@@ -302,48 +425,425 @@ def collect_files(directory: Path, not_match_patterns: list[str], exclude_extens
             continue
         
         # Apply filename pattern exclusion
-        filename = file_path.name
-        if any(pattern in filename for pattern in not_match_patterns):
+        if exclude_re and exclude_re.search(filename):
             continue
         
-        files.append(file_path)
+        files.append(Path(entry.path))
     
-    # Sort alphabetically by relative path
-    files.sort(key=lambda p: str(p.relative_to(directory)).lower())
+    # Sort alphabetically by relative path; all paths share the directory
+    # prefix, so sorting the full paths gives the same order
+    files.sort(key=lambda p: str(p).lower())
     
     return files
 
 
-def highlight_with_pygments(code: str, filename: str, anchor_prefix: str = "line") -> str:
-    """Use Pygments to syntax highlight the code."""
+def relative_names(files: list[Path], directory: Path) -> list[str]:
+    """Return each file's path relative to the directory it was collected from."""
+    # Slicing off the common prefix is much cheaper than Path.relative_to()
+    prefix_len = len(os.path.join(str(directory), ''))
+    return [str(p)[prefix_len:] for p in files]
+
+
+# Resolved lexers keyed by _lexer_key(); None records a name Pygments has no
+# lexer for, so those files go straight to guess_lexer()
+_LEXER_CACHE: dict = {}
+
+# Guessed lexers keyed by the first 512 characters of the content
+_GUESS_CACHE: dict = {}
+
+# Suffix -> lexer alias for suffixes claimed by exactly one lexer, and a regex
+# matching filenames Pygments resolves by more than their suffix (Makefile,
+# CMakeLists.txt, *.html.j2, ...). Both are built by _load_filename_index().
+_EXT_ALIASES: dict = {}
+_SPECIAL_NAMES_RE = None
+
+
+def _load_filename_index():
+    """Index the filename patterns of the builtin Pygments lexers."""
+    global _SPECIAL_NAMES_RE
+    claimants = {}
+    special = []
+    for _, aliases, filenames, _ in get_all_lexers(plugins=False):
+        for pattern in filenames:
+            if re.fullmatch(r'\*\.[^.*?\[\]]+', pattern):
+                claimants.setdefault(pattern[1:], set()).add(aliases[0] if aliases else None)
+            else:
+                special.append(fnmatch.translate(pattern))
+    
+    for suffix, owners in claimants.items():
+        if len(owners) == 1 and None not in owners:
+            _EXT_ALIASES[suffix] = owners.pop()
+    _SPECIAL_NAMES_RE = re.compile('|'.join(special))
+
+
+def _lexer_key(filename: str) -> str:
+    """
+    Return the lexer cache key for a filename.
+    
+    Files sharing a suffix share a lexer, except for names matched by one of
+    Pygments' non-`*.ext` patterns, which are keyed by their full name.
+    Suffixes keep their case since Pygments tells e.g. `*.S` from `*.s`.
+    """
+    if _SPECIAL_NAMES_RE is None:
+        _load_filename_index()
+    
+    name = Path(filename).name
+    suffix = Path(name).suffix
+    if not suffix or _SPECIAL_NAMES_RE.match(name):
+        return name
+    return suffix
+
+
+# Lexer classes resolved by earlier runs, as {key: [module, classname]};
+# loaded from CACHE_DIR on first use
+_SAVED_LEXERS = None
+
+
+def _load_saved_lexers() -> dict:
+    """Read the lexer cache file, ignoring it if missing, corrupt or stale."""
     try:
-        lexer = get_lexer_for_filename(filename)
-    except:
-        lexer = guess_lexer(code)
+        data = json.loads((CACHE_DIR / 'lexers.json').read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('pygments') != PYGMENTS_VERSION:
+        return {}
+    lexers = data.get('lexers')
+    if not isinstance(lexers, dict):
+        return {}
+    for entry in lexers.values():
+        if not (isinstance(entry, list) and len(entry) == 2
+                and all(isinstance(part, str) for part in entry)):
+            return {}
+    return lexers
+
+
+def _write_cache_file(path: Path, text: str):
+    """Atomically write a file under CACHE_DIR; failures are not fatal."""
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(text, encoding='utf-8')
+        os.replace(tmp_path, path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _save_lexers(new_lexers: dict):
+    """
+    Add entries to the lexer cache file.
     
-    formatter = HtmlFormatter(linenos=True, cssclass="highlight", lineanchors=anchor_prefix)
-    return highlight(code, lexer, formatter)
+    The file is re-read and merged just before it is replaced, so entries
+    written meanwhile by other worker processes are kept.
+    """
+    lexers = _load_saved_lexers()
+    lexers.update(new_lexers)
+    data = {'pygments': PYGMENTS_VERSION, 'lexers': lexers}
+    _write_cache_file(CACHE_DIR / 'lexers.json', json.dumps(data))
 
 
-def generate_file_section(file_path: Path, file_index: int, base_dir: Path = None) -> str:
-    """Generate HTML for a single file section."""
-    code = file_path.read_text()
+def _resolve_lexer(key: str, filename: str):
+    """Find the lexer for a cache key, consulting the on-disk cache first."""
+    global _SAVED_LEXERS
+    if _SAVED_LEXERS is None:
+        _SAVED_LEXERS = _load_saved_lexers()
     
-    # Use relative path for display if base_dir provided
-    if base_dir:
-        display_name = str(file_path.relative_to(base_dir))
-    else:
-        display_name = file_path.name
+    saved = _SAVED_LEXERS.get(key)
+    # The file names a class to import and call, so only Pygments' own
+    # lexer classes are accepted; anything else is re-resolved
+    if saved and (saved[0] + '.').startswith('pygments.lexers.'):
+        try:
+            module_name, class_name = saved
+            cls = getattr(importlib.import_module(module_name), class_name)
+            if isinstance(cls, type) and issubclass(cls, Lexer):
+                return cls()
+        except (ImportError, AttributeError, TypeError, ValueError):
+            pass
+    
+    alias = _EXT_ALIASES.get(key)
+    try:
+        if alias:
+            lexer = get_lexer_by_name(alias)
+        else:
+            # Ambiguous suffixes need Pygments' priority ranking
+            lexer = get_lexer_for_filename(filename)
+    except ClassNotFound:
+        return None
+    
+    _SAVED_LEXERS[key] = [type(lexer).__module__, type(lexer).__name__]
+    _save_lexers({key: _SAVED_LEXERS[key]})
+    return lexer
+
+
+def get_lexer(code: str, filename: str):
+    """Return a Pygments lexer for the file, reusing one per suffix."""
+    key = _lexer_key(filename)
+    if key not in _LEXER_CACHE:
+        _LEXER_CACHE[key] = _resolve_lexer(key, filename)
+    
+    lexer = _LEXER_CACHE[key]
+    if lexer is None:
+        # guess_lexer() runs every lexer's analyse_text(); the start of a file
+        # (shebang, modeline, first statements) decides it in practice
+        head = code[:512]
+        if head not in _GUESS_CACHE:
+            _GUESS_CACHE[head] = guess_lexer(code)
+        lexer = _GUESS_CACHE[head]
+    return lexer
+
+
+def make_formatter(anchor_prefix: str = "line"):
+    """
+    Create the HTML formatter.
+    
+    It only renders the highlighted lines (nowrap); the numbered table and
+    line anchors are added by wrap_linenos_table(), using the `lineanchors`
+    attribute as the anchor prefix.
+    """
+    return HtmlFormatter(nowrap=True, cssclass="highlight", lineanchors=anchor_prefix)
+
+
+# Same escapes as Pygments' HtmlFormatter, so plain text renders identically
+_HTML_ESCAPE_TABLE = str.maketrans({
+    '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;',
+})
+
+
+def wrap_linenos_table(lines: list[str], anchor_prefix: str) -> str:
+    """
+    Lay out highlighted lines in a numbered table.
+    
+    Produces the same markup as HtmlFormatter(linenos=True) with
+    `lineanchors` set, given the HTML of each line without its newline.
+    """
+    width = len(str(len(lines)))
+    numbers = '\n'.join(
+        f'<span class="normal">{n:>{width}}</span>' for n in range(1, len(lines) + 1)
+    )
+    code = ''.join(
+        f'<a id="{anchor_prefix}-{n}" name="{anchor_prefix}-{n}"></a>{line}\n'
+        for n, line in enumerate(lines, 1)
+    )
+    return (
+        '<div class="highlight"><table class="highlighttable"><tr>'
+        f'<td class="linenos"><div class="linenodiv"><pre>{numbers}</pre></div></td>'
+        f'<td class="code"><div><pre><span></span>{code}</pre></div></td>'
+        '</tr></table></div>\n'
+    )
+
+
+def clean_source(code: str) -> str:
+    """Apply Pygments' input cleanup: drop a BOM, unify line endings, strip blank edges."""
+    code = code.removeprefix('\ufeff').replace('\r\n', '\n').replace('\r', '\n')
+    return code.strip('\n')
+
+
+def highlight_plain_text(code: str, anchor_prefix: str) -> str:
+    """Render text the way Pygments' TextLexer would, without lexing it."""
+    lines = clean_source(code).translate(_HTML_ESCAPE_TABLE).split('\n')
+    return wrap_linenos_table(lines, anchor_prefix)
+
+
+# tree-sitter parsers by grammar name
+_TREE_SITTER_PARSERS: dict = {}
+
+
+def _tree_sitter_class(node) -> str:
+    """Map a tree-sitter node to the Pygments token class the stylesheet colors."""
+    node_type = node.type
+    if 'comment' in node_type:
+        return 'c'
+    if 'string' in node_type or node_type in ('char_literal', 'character_literal', 'heredoc_body'):
+        return 's'
+    if node_type in ('integer', 'float', 'number', 'number_literal', 'integer_literal', 'float_literal', 'int_literal'):
+        return 'm'
+    if not node.is_named:
+        # Anonymous nodes are the grammar's literal tokens: keywords,
+        # preprocessor directives or punctuation
+        if node_type.startswith('#'):
+            return 'cp'
+        return 'k' if node_type.isidentifier() else 'p'
+    if node_type in ('true', 'false', 'none', 'null', 'nil'):
+        return 'kc'
+    if node_type in ('type_identifier', 'primitive_type', 'predefined_type'):
+        return 'kt'
+    return 'n'
+
+
+def highlight_with_tree_sitter(code: str, filename: str, anchor_prefix: str):
+    """
+    Highlight code with a native tree-sitter parser.
+    
+    Returns None when there is no grammar for the file. Leaf nodes (and whole
+    comments and strings) become spans with Pygments token classes, laid out
+    in the same numbered table Pygments produces.
+    """
+    language = TREE_SITTER_LANGUAGES.get(Path(filename).suffix)
+    if language is None:
+        return None
+    if language not in _TREE_SITTER_PARSERS:
+        _TREE_SITTER_PARSERS[language] = make_tree_sitter_parser(language)
+    parser = _TREE_SITTER_PARSERS[language]
+    if parser is None:
+        return None
+    
+    data = clean_source(code).encode('utf-8')
+    tree = parser.parse(data)
     
-    # Generate syntax-highlighted code with unique anchor prefix
-    anchor_prefix = f"file{file_index}-line"
+    def text(start, end):
+        return data[start:end].decode('utf-8', errors='replace').translate(_HTML_ESCAPE_TABLE)
+    
+    parts = []
+    pos = 0
+    stack = [tree.root_node]
+    while stack:
+        node = stack.pop()
+        css_class = _tree_sitter_class(node)
+        if node.children and css_class not in ('c', 's'):
+            stack.extend(reversed(node.children))
+            continue
+        start = max(node.start_byte, pos)
+        if start > pos:
+            parts.append(text(pos, start))
+        # Close spans at line ends so each table row stays well-formed
+        parts.append('\n'.join(
+            f'<span class="{css_class}">{line}</span>' if line else ''
+            for line in text(start, node.end_byte).split('\n')
+        ))
+        pos = max(pos, node.end_byte)
+    parts.append(text(pos, len(data)))
+    
+    return wrap_linenos_table(''.join(parts).split('\n'), anchor_prefix)
+
+
+def highlight_with_pygments(code: str, filename: str, formatter) -> str:
+    """Use Pygments to syntax highlight the code."""
+    if _lexer_key(filename) in PLAIN_TEXT_SUFFIXES:
+        return highlight_plain_text(code, formatter.lineanchors)
     
+    lexer = get_lexer(code, filename)
+    # Every line ends with a newline, which leaves an empty string at the end
+    lines = highlight(code, lexer, formatter).split('\n')[:-1]
+    return wrap_linenos_table(lines, formatter.lineanchors)
+
+
+def read_source(path: Path) -> str:
+    """
+    Read a file as UTF-8, replacing undecodable bytes.
+    
+    Reading bytes and decoding once skips the text layer's locale lookup and
+    newline translation; Pygments normalizes line endings itself.
+    """
+    with open(path, 'rb') as f:
+        return f.read().decode('utf-8', errors='replace')
+
+
+def read_keyed_source(path: Path) -> tuple[str, str]:
+    """
+    Read a file like read_source() and compute its highlight cache key.
+    
+    The key covers the content, the lexer the file resolves to, the
+    Pygments version and whether tree-sitter is in use, so files with equal
+    keys highlight identically.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    backend = 'tree-sitter' if TREE_SITTER_AVAILABLE else 'pygments'
+    digest = content_hash(
+        f'{HTML_CACHE_VERSION}\0{PYGMENTS_VERSION}\0{backend}\0{_lexer_key(path.name)}\0'.encode()
+    )
+    digest.update(data)
+    return data.decode('utf-8', errors='replace'), digest.hexdigest()
+
+
+def read_ahead(paths: list[Path], read=read_source, depth: int = 8):
+    """
+    Yield read(path) for each path in order.
+    
+    Up to `depth` files are read ahead on background threads, so the next
+    file is usually in memory by the time the previous one is highlighted.
+    """
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        pending = deque()
+        for path in paths:
+            pending.append(executor.submit(read, path))
+            if len(pending) > depth:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def load_cached_html(key: str):
+    """Return the cached highlighted HTML for a key, or None."""
+    path = CACHE_DIR / 'html' / f'{key}.html'
+    try:
+        code_html = path.read_text(encoding='utf-8')
+    except OSError:
+        return None
+    # Entries are pruned by modification time, so mark this one as used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return code_html
+
+
+def save_cached_html(key: str, code_html: str):
+    """Store highlighted HTML under its key."""
+    _write_cache_file(CACHE_DIR / 'html' / f'{key}.html', code_html)
+
+
+def prune_html_cache(max_age_days: int = HTML_CACHE_MAX_AGE_DAYS):
+    """Remove highlighted-HTML cache entries not used in `max_age_days` days."""
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    try:
+        entries = os.scandir(CACHE_DIR / 'html')
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+
+def clear_cache():
+    """Delete everything src2html has cached under CACHE_DIR."""
+    shutil.rmtree(CACHE_DIR / 'html', ignore_errors=True)
+    (CACHE_DIR / 'lexers.json').unlink(missing_ok=True)
+
+
+def highlight_code(code: str, filename: str, formatter, anchor_prefix: str = "line") -> str:
+    """
+    Highlight code with tree-sitter (under --fast) or Pygments, or just
+    escape it when neither can handle the file.
+    """
+    if TREE_SITTER_AVAILABLE:
+        code_html = highlight_with_tree_sitter(code, filename, anchor_prefix)
+        if code_html is not None:
+            return code_html
     if PYGMENTS_AVAILABLE:
-        code_html = highlight_with_pygments(code, file_path.name, anchor_prefix)
-    else:
-        import html
-        escaped = html.escape(code)
-        code_html = f'<div class="highlight"><pre><code>{escaped}</code></pre></div>'
+        return highlight_with_pygments(code, filename, formatter)
+    escaped = html.escape(code)
+    return f'<div class="highlight"><pre><code>{escaped}</code></pre></div>'
+
+
+# Line anchor prefix used when highlighting bundle files. Each section swaps
+# in its own prefix, so highlighted HTML does not depend on the file's
+# position in the bundle and can be cached.
+_ANCHOR_PLACEHOLDER = "src2html-anchor"
+
+
+def generate_file_section(code_html: str, file_index: int, display_name: str) -> str:
+    """
+    Generate HTML for a single file section.
+    
+    `code_html` is highlighted with _ANCHOR_PLACEHOLDER line anchors and
+    `display_name` is the already HTML-escaped header text.
+    """
+    # Quotes in the code itself are escaped, so this only hits anchor attributes
+    code_html = code_html.replace(f'"{_ANCHOR_PLACEHOLDER}-', f'"file{file_index}-line-')
     
     return f'''<div class="file-section" id="file-{file_index}">
     <div class="file-header">{display_name}</div>
@@ -352,17 +852,25 @@ def generate_file_section(file_path: Path, file_index: int, base_dir: Path = Non
 '''
 
 
-def generate_toc(files: list[Path], base_dir: Path) -> str:
-    """Generate table of contents HTML."""
-    items = []
-    for i, file_path in enumerate(files):
-        display_name = str(file_path.relative_to(base_dir))
-        items.append(f'<li><a href="#file-{i}">{display_name}</a></li>')
+def generate_duplicate_section(file_index: int, display_name: str, original_index: int, original_name: str) -> str:
+    """Generate the section of a file identical to an earlier one, linking to it."""
+    return f'''<div class="file-section duplicate" id="file-{file_index}">
+    <div class="file-header">{display_name} (= <a href="#file-{original_index}">{original_name}</a>)</div>
+</div>
+'''
+
+
+def generate_toc(display_names: list[str]) -> str:
+    """Generate table of contents HTML from HTML-escaped file names."""
+    items = "".join(
+        f'<li><a href="#file-{i}">{display_name}</a></li>'
+        for i, display_name in enumerate(display_names)
+    )
     
     return f'''<div class="toc">
     <h2>Table of Contents</h2>
     <ul>
-        {"".join(items)}
+        {items}
     </ul>
 </div>
 '''
@@ -370,50 +878,157 @@ def generate_toc(files: list[Path], base_dir: Path) -> str:
 
 def generate_single_html(source_path: Path) -> str:
     """Generate HTML from a single source file (original behavior)."""
-    code = source_path.read_text()
+    code = read_source(source_path)
+    formatter = make_formatter() if PYGMENTS_AVAILABLE else None
+    code_html = highlight_code(code, source_path.name, formatter)
     
-    if PYGMENTS_AVAILABLE:
-        code_html = highlight_with_pygments(code, source_path.name)
-    else:
-        import html
-        escaped = html.escape(code)
-        code_html = f'<div class="highlight"><pre><code>{escaped}</code></pre></div>'
-    
-    html_content = HTML_HEADER.format(
-        title=source_path.name,
-        pygments_css=CATPPUCCIN_CSS
-    )
-    html_content += f'<div class="file-header">{source_path.name}</div>\n'
+    html_content = render_header(source_path.name)
+    html_content += f'<div class="file-header">{html.escape(source_path.name)}</div>\n'
     html_content += code_html
     html_content += HTML_FOOTER
     
     return html_content
 
 
-def generate_multi_html(files: list[Path], base_dir: Path, title: str) -> str:
-    """Generate HTML from multiple source files."""
-    html_content = HTML_HEADER.format(
-        title=title,
-        pygments_css=CATPPUCCIN_CSS
-    )
+# Formatter of a highlighting worker process, set up by _init_worker()
+_worker_formatter = None
+
+
+def _init_worker(use_tree_sitter: bool):
+    """Prepare a worker process: build the lexer index and a formatter."""
+    global _worker_formatter
+    if use_tree_sitter:
+        load_tree_sitter()
+    load_pygments()
+    _load_filename_index()
+    _worker_formatter = make_formatter(_ANCHOR_PLACEHOLDER)
+
+
+def _highlight_worker(code: str, filename: str) -> str:
+    """Highlight one file in a worker process."""
+    return highlight_code(code, filename, _worker_formatter, _ANCHOR_PLACEHOLDER)
+
+
+def highlight_files(files: list[Path], use_cache: bool = True):
+    """
+    Yield (duplicate_of, code_html) for each file in order.
     
-    # Add table of contents
-    html_content += generate_toc(files, base_dir)
+    A file whose content and lexer match an earlier file is not highlighted
+    again; it yields the earlier file's index and None instead. Files are
+    read ahead on threads. Results are reused from and added to the on-disk
+    cache, and bundles of PARALLEL_MIN_FILES or more files are highlighted
+    on worker processes.
+    """
+    if not PYGMENTS_AVAILABLE:
+        for file_path, code in zip(files, read_ahead(files)):
+            yield None, highlight_code(code, file_path.name, None, _ANCHOR_PLACEHOLDER)
+        return
     
-    # Add each file section
-    for i, file_path in enumerate(files):
-        html_content += generate_file_section(file_path, i, base_dir)
+    # Build the index before the reader threads need it for cache keys
+    _load_filename_index()
     
-    html_content += HTML_FOOTER
+    executor = None
+    if len(files) >= PARALLEL_MIN_FILES:
+        # The read_ahead() threads are already running when workers start,
+        # and forking a threaded process is unsafe; forkserver (or spawn,
+        # where forkserver is unsupported) workers start from a fresh import,
+        # which _init_worker() is written for
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+        else:
+            context = multiprocessing.get_context('spawn')
+        executor = ProcessPoolExecutor(
+            mp_context=context, initializer=_init_worker, initargs=(TREE_SITTER_AVAILABLE,)
+        )
+    formatter = make_formatter(_ANCHOR_PLACEHOLDER)
     
-    return html_content
+    def finish(key, code_html, duplicate_of):
+        if isinstance(code_html, Future):
+            code_html = code_html.result()
+        if key:
+            save_cached_html(key, code_html)
+        return duplicate_of, code_html
+    
+    # Entries are (key to save under or None, HTML or Future or None, index
+    # of an identical earlier file or None). With workers, keep a window of
+    # files in flight while earlier ones are written out.
+    window = 4 * (os.cpu_count() or 1) if executor else 0
+    pending = deque()
+    first_index = {}
+    try:
+        sources = read_ahead(files, read_keyed_source)
+        for i, (file_path, (code, key)) in enumerate(zip(files, sources)):
+            if key in first_index:
+                pending.append((None, None, first_index[key]))
+            else:
+                first_index[key] = i
+                code_html = load_cached_html(key) if use_cache else None
+                if code_html is not None:
+                    pending.append((None, code_html, None))
+                elif executor:
+                    future = executor.submit(_highlight_worker, code, file_path.name)
+                    pending.append((use_cache and key, future, None))
+                else:
+                    code_html = highlight_code(code, file_path.name, formatter, _ANCHOR_PLACEHOLDER)
+                    pending.append((use_cache and key, code_html, None))
+            if len(pending) > window:
+                yield finish(*pending.popleft())
+        while pending:
+            yield finish(*pending.popleft())
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+def write_multi_html(out, files: list[Path], names: list[str], title: str, use_cache: bool = True):
+    """
+    Write HTML for multiple source files to a text stream.
+    
+    `names` are the display names of the files, as from relative_names().
+    Sections are written as soon as they are ready, so the whole document
+    is never held in memory.
+    """
+    out.write(render_header(title))
+    
+    # Add table of contents; the escaped names are reused for the sections
+    display_names = list(map(html.escape, names))
+    out.write(generate_toc(display_names))
+    
+    # Add each file section; duplicates only link to their first copy
+    sections = highlight_files(files, use_cache)
+    for i, ((duplicate_of, code_html), display_name) in enumerate(zip(sections, display_names)):
+        if duplicate_of is None:
+            out.write(generate_file_section(code_html, i, display_name))
+        else:
+            out.write(generate_duplicate_section(i, display_name, duplicate_of, display_names[duplicate_of]))
+    
+    out.write(HTML_FOOTER)
+
+
+def gzip_output_path(output_path: Path, compress: bool) -> Path:
+    """Add a .gz suffix to the output path when compressing, unless present."""
+    if compress and output_path.suffix != '.gz':
+        return output_path.with_name(output_path.name + '.gz')
+    return output_path
+
+
+def open_output(output_path: Path, compress: bool):
+    """
+    Open the output file as a UTF-8 text stream, optionally gzip-compressed.
+    
+    Level 1 compression keeps up with the writer while still shrinking the
+    repetitive markup severalfold.
+    """
+    if compress:
+        return gzip.open(output_path, 'wt', encoding='utf-8', compresslevel=1)
+    return output_path.open('w', encoding='utf-8')
 
 
 def main():
     parser = argparse.ArgumentParser(
         description="Convert source code to syntax-highlighted HTML"
     )
-    parser.add_argument("source", help="Source file or directory to convert")
+    parser.add_argument("source", nargs="?", help="Source file or directory to convert")
     parser.add_argument(
         "-o", "--output", 
         help="Output HTML file (default: <source>.html or bundle.html for directories)"
@@ -437,9 +1052,38 @@ def main():
         default=[],
         help="Exclude files with this extension (can be used multiple times)"
     )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Re-highlight every file instead of reusing cached results"
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Delete cached lexers and highlighted files (source may be omitted)"
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Write gzip-compressed output (<output>.gz)"
+    )
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="Highlight supported languages with tree-sitter (needs tree_sitter_languages)"
+    )
     
     args = parser.parse_args()
     
+    if args.clear_cache:
+        clear_cache()
+        print(f"✓ Cleared cache: {CACHE_DIR}")
+        if args.source is None:
+            return
+    elif args.source is None:
+        parser.error("the following arguments are required: source")
+    
     # Expand comma-separated values in filter options
     def expand_comma_separated(items: list[str]) -> list[str]:
         result = []
@@ -456,41 +1100,64 @@ def main():
         print(f"Error: '{source_path}' not found", file=sys.stderr)
         sys.exit(1)
     
+    load_pygments()
+    if args.fast and not load_tree_sitter():
+        fallback = "using Pygments" if PYGMENTS_AVAILABLE else "code will not be highlighted"
+        print(
+            f"Warning: tree_sitter_languages is not installed or not working, {fallback}",
+            file=sys.stderr
+        )
+    
     if source_path.is_file():
         # Single file mode (original behavior)
         if args.output:
             output_path = Path(args.output)
         else:
             output_path = source_path.with_suffix(".html")
+        output_path = gzip_output_path(output_path, args.gzip)
         
         html_content = generate_single_html(source_path)
-        output_path.write_text(html_content)
+        with open_output(output_path, args.gzip) as out:
+            out.write(html_content)
         print(f"✓ Generated: {output_path}")
     
     else:
         # Directory mode (multi-file)
+        if args.output:
+            output_path = Path(args.output)
+        else:
+            output_path = source_path / "bundle.html"
+        output_path = gzip_output_path(output_path, args.gzip)
+        
+        # The output is truncated before the files are read, so a bundle
+        # from an earlier run must not be collected as a source file
         files = collect_files(source_path, args.not_match_f, args.exclude_ext)
+        resolved_output = output_path.resolve()
+        files = [f for f in files
+                 if f.name != resolved_output.name or f.resolve() != resolved_output]
         
         if not files:
             print("Error: No source files found", file=sys.stderr)
             sys.exit(1)
         
+        names = relative_names(files, source_path)
         print(f"Found {len(files)} files:")
-        for f in files:
-            print(f"  - {f.relative_to(source_path)}")
-        
-        if args.output:
-            output_path = Path(args.output)
-        else:
-            output_path = source_path / "bundle.html"
+        for name in names:
+            print(f"  - {name}")
         
         title = f"{source_path.name} - Source Code"
-        html_content = generate_multi_html(files, source_path, title)
-        output_path.write_text(html_content)
+        with open_output(output_path, args.gzip) as out:
+            write_multi_html(out, files, names, title, args.use_cache)
         print(f"✓ Generated: {output_path}")
+        
+        if args.use_cache:
+            prune_html_cache()
     
     # Optionally open in browser
-    if args.open:
+    if args.open and args.gzip:
+        # Browsers download file:// .html.gz instead of rendering it
+        print("Warning: --open is skipped for gzip-compressed output", file=sys.stderr)
+    elif args.open:
         webbrowser.open(f"file://{output_path.resolve()}")
         print("✓ Opened in browser")
 